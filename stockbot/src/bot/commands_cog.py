@@ -9,8 +9,8 @@ class StockCommands(commands.Cog):
         self.bot = bot
 
     @app_commands.command(name="start", description="Start tracking a product URL")
-    @app_commands.describe(url="The Amul product URL to track")
-    async def start(self, interaction: discord.Interaction, url: str):
+    @app_commands.describe(url="The Amul product URL to track", pincode="Delivery pincode for this product (defaults to your last one)")
+    async def start(self, interaction: discord.Interaction, url: str, pincode: str | None = None):
         try:
             await interaction.response.defer(ephemeral=False)
         except discord.errors.InteractionResponded:
@@ -21,23 +21,33 @@ class StockCommands(commands.Cog):
             await interaction.followup.send("❌ Invalid URL. Please provide a valid URL from shop.amul.com/product/...", ephemeral=True)
             return
 
+        if pincode and not checker.is_valid_pincode(pincode):
+            await interaction.followup.send("❌ Invalid pincode. Please provide a 6-digit Indian pincode.", ephemeral=True)
+            return
+
+        user_id = str(interaction.user.id)
+        pincode = pincode or await db.get_user_pincode(user_id)
+
         # Check Stock
-        status_msg = await interaction.followup.send(f"🔎 Checking stock for the first time...")
+        status_msg = await interaction.followup.send(f"🔎 Checking stock for the first time at {pincode}...")
         
-        result = await checker.check_stock(url)
+        result = await checker.check_stock(url, pincode)
         
         if result['status'] == 'error':
              await interaction.followup.send(f"❌ Error accessing URL: {result.get('error')}", ephemeral=True)
              return
 
         # Add to Redis
-        await db.add_product(url, result)
-        await db.subscribe_user(str(interaction.user.id), url)
+        if not await db.get_product(url):
+            await db.add_product(url, result)
+        await db.subscribe_user(user_id, url, pincode)
+        await db.update_availability(url, {pincode: result['status']})
 
         # Reply
         embed = discord.Embed(title="✅ Now Tracking", color=discord.Color.blue())
         embed.description = f"**{result['name']}**\nAdded to your tracking list."
         embed.add_field(name="Current Status", value=result['status'].replace('_', ' ').title(), inline=True)
+        embed.add_field(name="Pincode", value=f"{pincode} (this product only)", inline=True)
         if result.get('imageUrl'):
             embed.set_thumbnail(url=result['imageUrl'])
             
@@ -101,8 +111,8 @@ class StockCommands(commands.Cog):
                 await interaction.response.send_message(msg, ephemeral=True)
 
     @app_commands.command(name="status", description="Check stock status without tracking")
-    @app_commands.describe(url="The Amul product URL to check")
-    async def status(self, interaction: discord.Interaction, url: str):
+    @app_commands.describe(url="The Amul product URL to check", pincode="Delivery pincode to check (defaults to yours)")
+    async def status(self, interaction: discord.Interaction, url: str, pincode: str | None = None):
         try:
             await interaction.response.defer()
         except discord.errors.InteractionResponded:
@@ -111,8 +121,13 @@ class StockCommands(commands.Cog):
         if not checker.is_valid_amul_url(url):
             await interaction.followup.send("❌ Invalid URL.")
             return
-            
-        result = await checker.check_stock(url)
+
+        if pincode and not checker.is_valid_pincode(pincode):
+            await interaction.followup.send("❌ Invalid pincode.")
+            return
+
+        pincode = pincode or await db.get_user_pincode(str(interaction.user.id))
+        result = await checker.check_stock(url, pincode)
         
         if result['status'] == 'error':
              await interaction.followup.send(f"❌ Error: {result.get('error')}")
@@ -123,7 +138,7 @@ class StockCommands(commands.Cog):
             title="🟢 In Stock" if is_in_stock else "🔴 Out of Stock",
             color=discord.Color.green() if is_in_stock else discord.Color.red()
         )
-        embed.description = f"**{result['name']}**"
+        embed.description = f"**{result['name']}**\nPincode: {pincode}"
         embed.set_thumbnail(url=result['imageUrl'])
         
         await interaction.followup.send(embed=embed)
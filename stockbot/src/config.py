@@ -12,14 +12,63 @@ class Settings(BaseSettings):
     
     # Web
     WEB_PORT: int = 3000
+    COMPRESSION_MIN_BYTES: int = 500  # Smaller API responses are sent uncompressed
     
     # Checker
     CHECK_INTERVAL_MINUTES: int = 5
     DEFAULT_PINCODE: str = "110001"
+    MAX_PINCODE_CONTEXTS: int = 20  # Warm browser contexts kept, one per pincode
+    MAX_PAGES_PER_CONTEXT: int = 2  # Concurrent checks sharing one pincode context
+
+    # Shared on-disk cache for storefront scripts, styles, fonts and images
+    BROWSER_CACHE_ENABLED: bool = True
+    BROWSER_CACHE_DIR: str = ".cache/browser"
+    BROWSER_CACHE_MAX_MB: int = 200
+    BROWSER_CACHE_TTL_HOURS: int = 24
+    BROWSER_CACHE_EVICT_MINUTES: int = 30
+
+    # Change-detection pre-check ({alias} is the last segment of the product URL)
+    PRECHECK_ENABLED: bool = True
+    PRECHECK_URL_TEMPLATE: str = 'https://shop.amul.com/api/1/entity/ms.products?fields[name]=1&fields[available]=1&fields[inventory_quantity]=1&q={{"alias":"{alias}"}}&limit=1'
+    PRECHECK_MAX_STALENESS_MINUTES: int = 30
+    PRECHECK_TIMEOUT_SECONDS: float = 5.0
+
+    # Sharding (instances split products:all by consistent hashing)
+    INSTANCE_ID: str | None = None  # Defaults to hostname-pid
+    SHARD_HEARTBEAT_SECONDS: int = 10
+    SHARD_INSTANCE_TTL_SECONDS: int = 30
+    SHARD_VIRTUAL_NODES: int = 64
+
+    # Circuit Breaker
+    BREAKER_WINDOW_SIZE: int = 20
+    BREAKER_MIN_CALLS: int = 5
+    BREAKER_FAILURE_THRESHOLD: float = 0.5
+    BREAKER_SLOW_CALL_SECONDS: float = 20.0
+    BREAKER_OPEN_SECONDS: int = 60
+    BREAKER_MAX_OPEN_SECONDS: int = 900
+
+    # Sweep pacing (AIMD)
+    SWEEP_MAX_CONCURRENCY: int = 4
+    SWEEP_MIN_DELAY_SECONDS: float = 2.0
+    SWEEP_MAX_DELAY_SECONDS: float = 60.0
+    SWEEP_SCAN_COUNT: int = 100  # Products fetched per SSCAN chunk
     
+    # Tracing and profiling
+    TRACE_SAMPLE_RATE: float = 0.05  # Share of healthy checks kept; slow/failing ones always are
+    TRACE_BUFFER_SIZE: int = 200
+    TRACE_SLOW_SECONDS: float = 15.0
+    TRACE_PLAYWRIGHT: bool = False  # Save Playwright traces of slow or failing checks
+    TRACE_DIR: str = ".cache/traces"
+    TRACE_MAX_FILES: int = 50
+    PROFILE_MAX_SECONDS: int = 60
+    PROFILE_TOP_N: int = 40
+    ADMIN_TOKEN: str | None = None  # Required as X-Admin-Token on /api/admin; disabled when unset
+
     # Notification
     NOTIFICATION_TYPE: str = "dm"  # dm or channel
     NOTIFICATION_CHANNEL_ID: str | None = None
+    NOTIFY_DIGEST_WINDOW_SECONDS: int = 60  # 0 sends every change on its own
+    NOTIFY_IMMEDIATE_IN_STOCK: bool = True  # First restock per window skips the wait
 
     class Config:
         env_file = ".env"
@@ -1,15 +1,22 @@
-import asyncio
-import logging
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-import uvicorn
-import os
-
-from src.config import get_settings
-from src.web.routes import router as api_router
-from src.bot.client import bot_instance
-from src.services.scheduler import scheduler
+from src.services.startup import startup
+
+with startup.phase("imports"):
+    import asyncio
+    import logging
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI
+    import os
+    import sys
+
+    from src.config import get_settings
+    from src.web.routes import router as api_router
+    from src.web.compression import CompressionMiddleware, PrecompressedStaticFiles
+    from src.services.scheduler import scheduler
+    from src.services.redis_service import db
+    from src.services.stock_checker import checker
+    from src.services.change_detector import detector
+    from src.services.sharding import sharding
+    from src.services.notifier import notifier
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -17,37 +24,67 @@ logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+async def warm_up():
+    """Connect to Redis and prelaunch the browser concurrently.
+
+    The app is ready as soon as Redis answers; the browser keeps warming in
+    the background and checks launch it lazily if it isn't up yet.
+    """
+    async def warm_redis():
+        while not await startup.run("redis", db.ping()):
+            await asyncio.sleep(2)
+        startup.mark_ready()
+
+    await asyncio.gather(warm_redis(), startup.run("browser", checker.start()))
+    startup.log_report()
+
+async def start_bot():
+    try:
+        with startup.phase("discord"):
+            from src.bot.client import bot_instance
+        await bot_instance.start(settings.DISCORD_TOKEN)
+    except Exception as e:
+        logger.error(f"Failed to start Discord bot: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Amul Stock Tracker Bot...")
-    scheduler.start()
-    # Note: bot.start() is blocking if awaited directly, but create_task schedules it.
-    try:
-         asyncio.create_task(bot_instance.start(settings.DISCORD_TOKEN))
-    except Exception as e:
-        logger.error(f"Failed to start Discord bot: {e}")
-    
+    with startup.phase("scheduler"):
+        scheduler.start()
+    # Warm-up and bot login run in the background so the API serves immediately
+    asyncio.create_task(warm_up())
+    asyncio.create_task(start_bot())
+
     yield
-    
+
     # Shutdown
     logger.info("🛑 Shutting down services...")
     scheduler.stop()
-    if bot_instance.is_ready():
-        await bot_instance.close()
+    await sharding.leave()
+    await notifier.flush_all()
+    bot_client = sys.modules.get("src.bot.client")
+    if bot_client and bot_client.bot_instance.is_ready():
+        await bot_client.bot_instance.close()
+    await checker.stop()
+    await detector.close()
+    await db.close()
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
 
 # Include API Routes
 app.include_router(api_router)
 
 # Mount Static Files (Dashboard)
-# Verify static directory exists at src/web/static
-static_dir = os.path.join(os.path.dirname(__file__), "web", "static")
+# Prefer the hashed, precompressed build (python -m src.web.build_static) over src/web/static
+static_dir = os.path.join(os.path.dirname(__file__), "web", "dist")
 if not os.path.exists(static_dir):
+    static_dir = os.path.join(os.path.dirname(__file__), "web", "static")
     os.makedirs(static_dir, exist_ok=True)
 
-app.mount("/", StaticFiles(directory=static_dir, html=True), name="static")
+app.mount("/", PrecompressedStaticFiles(directory=static_dir, html=True), name="static")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("src.main:app", host="0.0.0.0", port=settings.WEB_PORT, reload=False)
@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from urllib.parse import urlparse
+from src.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CACHEABLE_TYPES = {'script', 'stylesheet', 'font', 'image'}
+
+# Only these are routed through the cache; documents and XHR go straight to the network
+STATIC_EXTENSIONS = ('.js', '.css', '.woff', '.woff2', '.ttf', '.otf', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.ico')
+
+# Bundler output like app.3f2a9c1b.js or chunk-vendors-3f2a9c1b.css
+HASHED_ASSET = re.compile(r'[.\-_][0-9a-f]{8,}\.[a-z0-9]+$')
+
+# Bodies are stored decoded, so transfer headers no longer apply, and cookies
+# must not be replayed into other pincode contexts
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie'}
+
+class AssetCache:
+    """Shared on-disk cache for the storefront's static assets.
+
+    Every checker context routes scripts, styles, fonts and images through
+    this cache, so the Vue bundles are downloaded once and reused across
+    checks, pincode contexts and browser restarts. Entries honour
+    Cache-Control (never no-store, at most max-age) and expire after
+    BROWSER_CACHE_TTL_HOURS at the latest; without a max-age only
+    content-hashed URLs are kept, so an unhashed script can't outlive a
+    storefront deploy. The directory is trimmed to BROWSER_CACHE_MAX_MB
+    least-recently-used first.
+    """
+
+    def __init__(self):
+        self.directory = settings.BROWSER_CACHE_DIR
+        self.stats = {"hits": 0, "misses": 0, "bytesFetched": 0, "bytesServed": 0}
+
+    def is_static_url(self, url: str) -> bool:
+        """URL predicate for page.route, so only static assets leave the browser."""
+        return urlparse(url).path.lower().endswith(STATIC_EXTENSIONS)
+
+    def handles(self, request) -> bool:
+        return (
+            request.method == 'GET'
+            and request.resource_type in CACHEABLE_TYPES
+            and self.is_static_url(request.url)
+        )
+
+    def _lifetime(self, url: str, headers: dict) -> int:
+        """Seconds a response may be served from the cache, 0 to not store it."""
+        cache_control = headers.get('cache-control', '').lower()
+        if any(directive in cache_control for directive in ('no-store', 'no-cache', 'private')):
+            return 0
+        ttl = settings.BROWSER_CACHE_TTL_HOURS * 3600
+        max_age = re.search(r'max-age=(\d+)', cache_control)
+        if max_age:
+            return min(int(max_age.group(1)), ttl)
+        return ttl if HASHED_ASSET.search(urlparse(url).path.lower()) else 0
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest())
+
+    def _read(self, url: str):
+        path = self._path(url)
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+            if time.time() > meta["expiresAt"]:
+                return None
+            with open(f"{path}.body", 'rb') as f:
+                body = f.read()
+            os.utime(f"{path}.body")  # Recency for LRU eviction
+            return meta, body
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, url: str, status: int, headers: dict, body: bytes, lifetime: int):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(url)
+        # Readers never see a partial file: each is written aside and renamed
+        # into place, body first so fresh metadata never points at an old body
+        self._replace(f"{path}.body", body)
+        now = time.time()
+        meta = {"url": url, "status": status, "headers": headers, "storedAt": now, "expiresAt": now + lifetime}
+        self._replace(f"{path}.json", json.dumps(meta).encode())
+
+    def _replace(self, path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{id(data)}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    async def handle_route(self, route, page_stats: dict = None):
+        """Playwright route handler serving cacheable GETs from disk."""
+        request = route.request
+        if not self.handles(request):
+            await route.continue_()
+            return
+
+        cached = await asyncio.to_thread(self._read, request.url)
+        if cached:
+            meta, body = cached
+            self._count(page_stats, "hits", 1)
+            self._count(page_stats, "bytesServed", len(body))
+            await route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+            return
+
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            # Settle the route so the page doesn't wait on it until the timeout
+            logger.debug(f"Asset fetch failed for {request.url}: {e}")
+            try:
+                await route.abort()
+            except Exception:
+                pass
+            return
+        self._count(page_stats, "misses", 1)
+        self._count(page_stats, "bytesFetched", len(body))
+
+        headers = {k.lower(): v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS}
+        lifetime = self._lifetime(request.url, headers) if response.status == 200 else 0
+        if lifetime:
+            try:
+                await asyncio.to_thread(self._write, request.url, response.status, headers, body, lifetime)
+            except OSError as e:
+                logger.warning(f"Asset cache write failed: {e}")
+        await route.fulfill(status=response.status, headers=headers, body=body)
+
+    def _count(self, page_stats: dict, key: str, amount: int):
+        self.stats[key] += amount
+        if page_stats is not None:
+            page_stats[key] = page_stats.get(key, 0) + amount
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return round(self.stats["hits"] / total, 3) if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "hitRate": self.hit_rate()}
+
+    def _evict(self):
+        if not os.path.isdir(self.directory):
+            return 0
+
+        entries = []
+        now = time.time()
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                # Leftover from a write interrupted by a crash
+                path = os.path.join(self.directory, name)
+                try:
+                    if now - os.stat(path).st_mtime > 3600:
+                        os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith('.body'):
+                continue
+            base = os.path.join(self.directory, name[:-len('.body')])
+            try:
+                stat = os.stat(f"{base}.body")
+                with open(f"{base}.json") as f:
+                    expires_at = json.load(f)["expiresAt"]
+            except (OSError, ValueError, KeyError):
+                expires_at = 0
+                stat = None
+
+            if stat is None or now > expires_at:
+                self._remove(base)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, base))
+
+        # Least recently used first until under the size budget
+        budget = settings.BROWSER_CACHE_MAX_MB * 1024 * 1024
+        total = sum(size for _, size, _ in entries)
+        for _, size, base in sorted(entries):
+            if total <= budget:
+                break
+            self._remove(base)
+            total -= size
+            removed += 1
+        return removed
+
+    def _remove(self, base: str):
+        for suffix in ('.body', '.json'):
+            try:
+                os.remove(f"{base}{suffix}")
+            except OSError:
+                pass
+
+    async def evict(self):
+        removed = await asyncio.to_thread(self._evict)
+        if removed:
+            logger.info(f"🧹 Evicted {removed} cached asset(s)")
+
+asset_cache = AssetCache()
@@ -0,0 +1,99 @@
+from urllib.parse import urlparse
+import hashlib
+import logging
+import time
+from src.config import get_settings
+from src.services.redis_service import db
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class ChangeDetector:
+    """Cheap HTTP pre-check that decides whether a full browser render is needed.
+
+    The product's data response is fetched with the stored ETag/Last-Modified
+    as conditional headers. A 304, or a 200 whose body hashes the same as last
+    time, means nothing changed. Fingerprints are only committed after a full
+    check succeeds, and every product is fully rendered at least once per
+    PRECHECK_MAX_STALENESS_MINUTES regardless.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.stats = {"unchanged": 0, "changed": 0, "stale": 0, "failed": 0}
+
+    async def _get_session(self):
+        if self.session is None:
+            import aiohttp
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=settings.PRECHECK_TIMEOUT_SECONDS),
+                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+            )
+        return self.session
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def _data_url(self, url: str) -> str:
+        alias = urlparse(url).path.rstrip('/').split('/')[-1]
+        return settings.PRECHECK_URL_TEMPLATE.format(alias=alias, url=url)
+
+    async def check(self, url: str):
+        """Return (changed, fingerprint). Any doubt counts as changed."""
+        if not settings.PRECHECK_ENABLED:
+            return True, None
+
+        stored = await db.get_fingerprint(url)
+        max_age_ms = settings.PRECHECK_MAX_STALENESS_MINUTES * 60 * 1000
+        is_stale = not stored or int(time.time() * 1000) - int(stored.get('checkedAt', 0)) >= max_age_ms
+
+        headers = {}
+        if stored.get('etag'):
+            headers['If-None-Match'] = stored['etag']
+        if stored.get('lastModified'):
+            headers['If-Modified-Since'] = stored['lastModified']
+
+        try:
+            session = await self._get_session()
+            async with session.get(self._data_url(url), headers=headers) as response:
+                if response.status == 304:
+                    fingerprint = dict(stored)
+                elif response.status == 200:
+                    body = await response.read()
+                    fingerprint = {
+                        "etag": response.headers.get('ETag', ''),
+                        "lastModified": response.headers.get('Last-Modified', ''),
+                        "hash": hashlib.sha256(body).hexdigest(),
+                    }
+                else:
+                    raise RuntimeError(f"HTTP {response.status}")
+        except Exception as e:
+            logger.debug(f"Pre-check failed for {url}: {e}")
+            self.stats["failed"] += 1
+            return True, None
+
+        if is_stale:
+            self.stats["stale"] += 1
+            return True, fingerprint
+
+        if fingerprint.get('hash') != stored.get('hash'):
+            self.stats["changed"] += 1
+            return True, fingerprint
+
+        self.stats["unchanged"] += 1
+        return False, fingerprint
+
+    async def commit(self, url: str, fingerprint: dict | None):
+        """Store the fingerprint a successful full check was based on."""
+        if fingerprint is None:
+            return
+        await db.set_fingerprint(url, {
+            "etag": fingerprint.get('etag', ''),
+            "lastModified": fingerprint.get('lastModified', ''),
+            "hash": fingerprint.get('hash', ''),
+            "checkedAt": str(int(time.time() * 1000)),
+        })
+
+detector = ChangeDetector()
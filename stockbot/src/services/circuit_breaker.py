@@ -0,0 +1,152 @@
+from collections import deque
+from urllib.parse import urlparse
+import asyncio
+import logging
+import time
+from src.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """Per-host breaker that also paces browser checks against that host.
+
+    Errors and slow checks count as failures in a sliding window. When the
+    failure rate crosses the threshold the breaker opens and checks fail fast;
+    after a cool-down a single half-open probe decides whether to close again.
+    Concurrent browser checks and crawl delay follow AIMD: every healthy check
+    adds a slot and trims the delay, every failure halves slots and doubles delay.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=settings.BREAKER_WINDOW_SIZE)  # True = failed
+        self.opened_at = 0.0
+        self.open_seconds = settings.BREAKER_OPEN_SECONDS
+        self.probe_in_flight = False
+
+        # Browser check pacing
+        self.concurrency = 1
+        self.delay = settings.SWEEP_MIN_DELAY_SECONDS
+        self.active = 0
+        self._slots = asyncio.Condition()
+
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def allow_request(self) -> tuple[bool, bool]:
+        """Return (allowed, is_probe); pass is_probe back to record()."""
+        if self.state == self.OPEN:
+            if self.is_open():
+                return False, False
+            self.state = self.HALF_OPEN
+            logger.info(f"🟡 Circuit half-open for {self.host}, sending probe")
+
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                return False, False
+            self.probe_in_flight = True
+            return True, True
+        return True, False
+
+    def record(self, ok: bool, latency: float, probe: bool = False):
+        failed = not ok or latency >= settings.BREAKER_SLOW_CALL_SECONDS
+
+        if self.state == self.HALF_OPEN:
+            if not probe:
+                # Started before the trip; only the probe decides
+                return
+            self.probe_in_flight = False
+            if failed:
+                self._trip(backoff=True)
+            else:
+                self._close()
+            return
+
+        if self.state == self.OPEN:
+            # Straggler from before the breaker tripped
+            return
+
+        self.outcomes.append(failed)
+        if failed:
+            self._decrease()
+        else:
+            self._increase()
+
+        if len(self.outcomes) >= settings.BREAKER_MIN_CALLS and self.failure_rate() >= settings.BREAKER_FAILURE_THRESHOLD:
+            self._trip()
+
+    def failure_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(self.outcomes) / len(self.outcomes)
+
+    def _trip(self, backoff: bool = False):
+        if backoff:
+            self.open_seconds = min(self.open_seconds * 2, settings.BREAKER_MAX_OPEN_SECONDS)
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        self.concurrency = 1
+        self.delay = settings.SWEEP_MAX_DELAY_SECONDS
+        logger.warning(f"🔴 Circuit opened for {self.host} for {self.open_seconds}s")
+
+    def _close(self):
+        self.state = self.CLOSED
+        self.open_seconds = settings.BREAKER_OPEN_SECONDS
+        self.outcomes.clear()
+        self.delay = settings.SWEEP_MIN_DELAY_SECONDS
+        logger.info(f"🟢 Circuit closed for {self.host}")
+
+    def _increase(self):
+        self.concurrency = min(self.concurrency + 1, settings.SWEEP_MAX_CONCURRENCY)
+        self.delay = max(self.delay - settings.SWEEP_MIN_DELAY_SECONDS, settings.SWEEP_MIN_DELAY_SECONDS)
+
+    def _decrease(self):
+        self.concurrency = max(self.concurrency // 2, 1)
+        self.delay = min(self.delay * 2, settings.SWEEP_MAX_DELAY_SECONDS)
+
+    async def acquire(self):
+        """Wait for a browser-check slot under the current concurrency limit."""
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.active < self.concurrency)
+            self.active += 1
+
+    async def release(self):
+        async with self._slots:
+            self.active -= 1
+            self._slots.notify_all()
+
+    async def release_after(self, delay: float):
+        """Hold the slot through the crawl delay, then free it."""
+        await asyncio.sleep(delay)
+        await self.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.OPEN if self.is_open() else (self.HALF_OPEN if self.state != self.CLOSED else self.CLOSED),
+            "failureRate": round(self.failure_rate(), 2),
+            "concurrency": self.concurrency,
+            "delay": self.delay,
+            "active": self.active,
+        }
+
+class CircuitBreakerRegistry:
+    def __init__(self):
+        self.breakers = {}
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).hostname or ''
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(host)
+        return self.breakers[host]
+
+    def snapshot(self) -> dict:
+        return {host: breaker.snapshot() for host, breaker in self.breakers.items()}
+
+breakers = CircuitBreakerRegistry()
@@ -1,18 +1,49 @@
-import discord
+from typing import TYPE_CHECKING
+import asyncio
 import logging
 from src.config import get_settings
 
+if TYPE_CHECKING:
+    import discord
+
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Discord limits
+EMBED_MAX_FIELDS = 25
+MESSAGE_MAX_EMBEDS = 10
+MESSAGE_MAX_EMBED_CHARS = 6000  # Across every embed in one message
+MESSAGE_MAX_CONTENT = 2000
+
+def _pack(items: list, sizes: list[int], max_count: int, max_chars: int) -> list[list]:
+    """Split items into consecutive batches under both a count and a character budget."""
+    batches, batch, chars = [], [], 0
+    for item, size in zip(items, sizes):
+        if batch and (len(batch) >= max_count or chars + size > max_chars):
+            batches.append(batch)
+            batch, chars = [], 0
+        batch.append(item)
+        chars += size
+    if batch:
+        batches.append(batch)
+    return batches
+
 class NotifierService:
     def __init__(self):
         self.bot = None
+        self.bot_ready = asyncio.Event()
+        # Digest buffers keyed by recipient (user id, or 'channel')
+        self.pending = {}
+        self._flush_tasks = {}
+        self._sent_immediately = set()
 
-    def set_bot(self, bot: discord.Client):
+    def set_bot(self, bot: "discord.Client"):
         self.bot = bot
+        self.bot_ready.set()
+
+    def _create_embed(self, product: dict, old_status: str, new_status: str, pincode: str = None):
+        import discord
 
-    def _create_embed(self, product: dict, old_status: str, new_status: str):
         is_back_in_stock = new_status == 'in_stock'
         color = discord.Color.green() if is_back_in_stock else discord.Color.red()
         title = "🟢 Back in Stock!" if is_back_in_stock else "🔴 Out of Stock!"
@@ -26,6 +57,8 @@ class NotifierService:
         
         embed.add_field(name="Status", value="✅ Available" if is_back_in_stock else "❌ Sold Out", inline=True)
         embed.add_field(name="Previous", value=self._format_status(old_status), inline=True)
+        if pincode:
+            embed.add_field(name="Pincode", value=pincode, inline=True)
         
         if product.get('imageUrl'):
             embed.set_thumbnail(url=product['imageUrl'])
@@ -37,31 +70,141 @@ class NotifierService:
         embed.timestamp = discord.utils.utcnow()
         return embed
 
+    def _create_digest_embeds(self, changes: list[dict]):
+        import discord
+
+        in_stock = sum(1 for change in changes if change['new'] == 'in_stock')
+        out_of_stock = len(changes) - in_stock
+        title = f"📦 {len(changes)} Stock Updates"
+        description = f"🟢 {in_stock} back in stock · 🔴 {out_of_stock} sold out"
+        footer = "Amul Stock Tracker"
+
+        fields = []
+        for change in changes:
+            product = change['product']
+            is_back_in_stock = change['new'] == 'in_stock'
+            value = f"{self._format_status(change['old'])} → {self._format_status(change['new'])}"
+            if change['pincode']:
+                value += f" · 📍 {change['pincode']}"
+            value += f"\n[{'Buy Now' if is_back_in_stock else 'Link'}]({product.get('url', '')})"
+            name = f"{'🟢' if is_back_in_stock else '🔴'} {product.get('name', 'Unknown Product')[:200]}"
+            fields.append((name, value))
+
+        # Each embed must fit a message's character budget on its own
+        budget = MESSAGE_MAX_EMBED_CHARS - len(title) - len(description) - len(footer)
+        embeds = []
+        for batch in _pack(fields, [len(name) + len(value) for name, value in fields], EMBED_MAX_FIELDS, budget):
+            embed = discord.Embed(
+                title=title,
+                description=description,
+                color=discord.Color.green() if in_stock else discord.Color.red()
+            )
+            for name, value in batch:
+                embed.add_field(name=name, value=value, inline=False)
+            embed.set_footer(text=footer)
+            embed.timestamp = discord.utils.utcnow()
+            embeds.append(embed)
+        return embeds
+
     def _format_status(self, status: str):
         if status == 'in_stock': return '✅ In Stock'
         if status == 'out_of_stock': return '❌ Out of Stock'
         if status == 'unknown': return '❓ Unknown'
         return status
 
-    async def notify_users(self, user_ids: list[str], product: dict, old_status: str, new_status: str):
+    async def notify_users(self, user_ids: list[str], product: dict, old_status: str, new_status: str, pincode: str = None):
         if not self.bot:
             logger.error("Notifier: Bot instance not set")
             return
 
-        embed = self._create_embed(product, old_status, new_status)
-        
-        for user_id in user_ids:
-            try:
-                if settings.NOTIFICATION_TYPE == 'channel' and settings.NOTIFICATION_CHANNEL_ID:
-                    channel = self.bot.get_channel(int(settings.NOTIFICATION_CHANNEL_ID))
-                    if channel:
-                        await channel.send(content=f"<@{user_id}>", embed=embed)
-                else:
-                    user = await self.bot.fetch_user(int(user_id))
-                    if user:
-                        await user.send(embed=embed)
-                logger.info(f"Notified user {user_id} about {product.get('name')}")
-            except Exception as e:
-                logger.error(f"Failed to notify user {user_id}: {e}")
+        change = {"product": product, "old": old_status, "new": new_status, "pincode": pincode}
+
+        if settings.NOTIFICATION_TYPE == 'channel' and settings.NOTIFICATION_CHANNEL_ID:
+            await self._enqueue('channel', change, user_ids)
+        else:
+            for user_id in user_ids:
+                await self._enqueue(user_id, change, [user_id])
+
+    async def _enqueue(self, recipient: str, change: dict, mentions: list[str]):
+        """Buffer a change for a recipient and flush once the digest window closes."""
+        if settings.NOTIFY_DIGEST_WINDOW_SECONDS <= 0:
+            await self._send(recipient, [{**change, "mentions": set(mentions)}])
+            return
+
+        # The first restock in a window goes out right away
+        if settings.NOTIFY_IMMEDIATE_IN_STOCK and change['new'] == 'in_stock' and recipient not in self._sent_immediately:
+            self._sent_immediately.add(recipient)
+            self._schedule_flush(recipient)
+            await self._send(recipient, [{**change, "mentions": set(mentions)}])
+            return
+
+        # Coalesce repeated flips of the same product and pincode within the window
+        buffer = self.pending.setdefault(recipient, {})
+        key = (change['product'].get('url'), change['pincode'])
+        if key in buffer:
+            buffer[key].update(product=change['product'], new=change['new'])
+            buffer[key]['mentions'].update(mentions)
+        else:
+            buffer[key] = {**change, "mentions": set(mentions)}
+        self._schedule_flush(recipient)
+
+    def _schedule_flush(self, recipient: str):
+        if recipient not in self._flush_tasks:
+            self._flush_tasks[recipient] = asyncio.create_task(self._flush_later(recipient))
+
+    async def _flush_later(self, recipient: str):
+        await asyncio.sleep(settings.NOTIFY_DIGEST_WINDOW_SECONDS)
+        self._flush_tasks.pop(recipient, None)
+        await self._flush(recipient)
+
+    async def _flush(self, recipient: str):
+        self._sent_immediately.discard(recipient)
+        buffer = self.pending.pop(recipient, {})
+        # Flips that ended where they started within the window are not news
+        changes = [change for change in buffer.values() if change['old'] != change['new']]
+        if changes:
+            await self._send(recipient, changes)
+
+    async def flush_all(self):
+        """Send every pending digest now, e.g. on shutdown."""
+        for task in self._flush_tasks.values():
+            task.cancel()
+        self._flush_tasks.clear()
+        for recipient in list(self.pending):
+            await self._flush(recipient)
+
+    async def _send(self, recipient: str, changes: list[dict]):
+        if len(changes) == 1:
+            change = changes[0]
+            embeds = [self._create_embed(change['product'], change['old'], change['new'], change['pincode'])]
+        else:
+            embeds = self._create_digest_embeds(changes)
+
+        # As few messages as Discord allows: up to 10 embeds and 6000 characters each
+        messages = _pack(embeds, [len(embed) for embed in embeds], MESSAGE_MAX_EMBEDS, MESSAGE_MAX_EMBED_CHARS)
+
+        try:
+            if recipient == 'channel':
+                channel = self.bot.get_channel(int(settings.NOTIFICATION_CHANNEL_ID))
+                if not channel:
+                    return
+                mentions = [f"<@{user_id}>" for user_id in sorted(set().union(*(change['mentions'] for change in changes)))]
+                contents = [" ".join(batch) for batch in _pack(mentions, [len(mention) + 1 for mention in mentions], len(mentions), MESSAGE_MAX_CONTENT)]
+                for i in range(max(len(messages), len(contents))):
+                    kwargs = {}
+                    if i < len(contents):
+                        kwargs['content'] = contents[i]
+                    if i < len(messages):
+                        kwargs['embeds'] = messages[i]
+                    await channel.send(**kwargs)
+            else:
+                user = await self.bot.fetch_user(int(recipient))
+                if not user:
+                    return
+                for batch in messages:
+                    await user.send(embeds=batch)
+            logger.info(f"Notified {recipient} about {len(changes)} change(s)")
+        except Exception as e:
+            logger.error(f"Failed to notify {recipient}: {e}")
 
 notifier = NotifierService()
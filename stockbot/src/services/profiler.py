@@ -0,0 +1,48 @@
+import asyncio
+import cProfile
+import io
+import pstats
+from src.config import get_settings
+
+settings = get_settings()
+
+class Profiler:
+    """Time-boxed CPU profile and asyncio task snapshot of the live process."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    def is_running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float) -> dict:
+        async with self._lock:
+            # The event loop runs on this thread, so every callback in the window is profiled
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(settings.PROFILE_TOP_N)
+            return {"seconds": seconds, "cpu": stream.getvalue(), "tasks": self.task_snapshot()}
+
+    def task_snapshot(self) -> list[dict]:
+        tasks = []
+        for task in asyncio.all_tasks():
+            coro = task.get_coro()
+            frames = task.get_stack(limit=1)
+            where = None
+            if frames:
+                frame = frames[0]
+                where = f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+            tasks.append({
+                "name": task.get_name(),
+                "coro": getattr(coro, '__qualname__', repr(coro)),
+                "where": where,
+            })
+        return tasks
+
+profiler = Profiler()
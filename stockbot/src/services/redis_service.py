@@ -1,16 +1,28 @@
-import redis.asyncio as redis
 import json
 import time
 from src.config import get_settings
+from src.services.tracing import tracer
 
 settings = get_settings()
 
 class RedisService:
     def __init__(self):
-        self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._redis = None
+
+    @property
+    def redis(self):
+        # Client is created on first use so importing this module stays cheap
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    async def ping(self):
+        return await self.redis.ping()
 
     async def close(self):
-        await self.redis.close()
+        if self._redis is not None:
+            await self._redis.close()
 
     def _url_to_key(self, url: str) -> str:
         import base64
@@ -39,11 +51,12 @@ class RedisService:
         
         if subscriber_count == 0:
             key = f"product:{self._url_to_key(url)}"
-            await self.redis.delete(key)
+            await self.redis.delete(key, f"{key}:availability", f"{key}:fingerprint", f"{key}:pincodes")
             await self.redis.srem("products:all", url)
             return True
         return False
 
+    @tracer.traced("redis.get_product")
     async def get_product(self, url: str):
         key = f"product:{self._url_to_key(url)}"
         data = await self.redis.hgetall(key)
@@ -51,17 +64,58 @@ class RedisService:
             return None
         return data
 
+    async def get_all_product_urls(self):
+        return await self.redis.smembers("products:all")
+
     async def get_all_products(self):
-        urls = await self.redis.smembers("products:all")
+        urls = await self.get_all_product_urls()
+        return await self.get_products(urls)
+
+    async def get_products(self, urls):
         products = []
         for url in urls:
             product = await self.get_product(url)
             if product:
                 subscribers = await self.get_subscribers(url)
                 product["subscribers"] = list(subscribers)
+                product["availability"] = await self.get_availability(url)
                 products.append(product)
         return products
 
+    async def count_products(self):
+        return await self.redis.scard("products:all")
+
+    async def iter_products(self, fields=("url", "name", "status", "imageUrl"), url_filter=None, count: int = None):
+        """Stream products in SSCAN chunks, fetching only the given hash fields.
+
+        Each chunk's hashes are read in one pipelined round trip, so memory stays
+        bounded by the chunk size. SSCAN may repeat a member while the set is
+        rehashing; a duplicate only costs one extra check.
+        """
+        fields = list(fields)
+        cursor = 0
+        while True:
+            cursor, urls = await self.redis.sscan("products:all", cursor=cursor, count=count or settings.SWEEP_SCAN_COUNT)
+            if url_filter:
+                urls = [url for url in urls if url_filter(url)]
+
+            if urls:
+                pipe = self.redis.pipeline(transaction=False)
+                for url in urls:
+                    pipe.hmget(f"product:{self._url_to_key(url)}", fields)
+                rows = await pipe.execute()
+
+                for url, values in zip(urls, rows):
+                    if all(value is None for value in values):
+                        continue
+                    product = dict(zip(fields, values))
+                    product["url"] = url
+                    yield product
+
+            if cursor == 0:
+                break
+
+    @tracer.traced("redis.update_product_status")
     async def update_product_status(self, url: str, status: str, additional_data: dict = None):
         key = f"product:{self._url_to_key(url)}"
         if not await self.redis.exists(key):
@@ -77,15 +131,38 @@ class RedisService:
         await self.redis.hset(key, mapping=data)
         return True
 
+    @tracer.traced("redis.touch_product")
+    async def touch_product(self, url: str):
+        """Mark a product as checked without changing its status."""
+        key = f"product:{self._url_to_key(url)}"
+        if not await self.redis.exists(key):
+            return False
+        await self.redis.hset(key, "lastChecked", str(int(time.time() * 1000)))
+        return True
+
+    @tracer.traced("redis.get_fingerprint")
+    async def get_fingerprint(self, url: str):
+        return await self.redis.hgetall(f"product:{self._url_to_key(url)}:fingerprint")
+
+    @tracer.traced("redis.set_fingerprint")
+    async def set_fingerprint(self, url: str, fingerprint: dict):
+        await self.redis.hset(f"product:{self._url_to_key(url)}:fingerprint", mapping=fingerprint)
+        return True
+
     # ============ User Subscription Operations ============
 
-    async def subscribe_user(self, user_id: str, url: str):
+    async def subscribe_user(self, user_id: str, url: str, pincode: str = None):
+        if pincode:
+            # Pincode applies to this subscription; the user's default only seeds future ones
+            await self.redis.hset(f"product:{self._url_to_key(url)}:pincodes", user_id, pincode)
+            await self.set_user_pincode(user_id, pincode)
         await self.redis.sadd(f"product:{self._url_to_key(url)}:subscribers", user_id)
         await self.redis.sadd(f"user:{user_id}:products", url)
         return True
 
     async def unsubscribe_user(self, user_id: str, url: str):
         await self.redis.srem(f"product:{self._url_to_key(url)}:subscribers", user_id)
+        await self.redis.hdel(f"product:{self._url_to_key(url)}:pincodes", user_id)
         await self.redis.srem(f"user:{user_id}:products", url)
         await self.remove_product(url) # Cleanup if empty
         return True
@@ -108,6 +185,64 @@ class RedisService:
     async def is_user_subscribed(self, user_id: str, url: str):
         return await self.redis.sismember(f"product:{self._url_to_key(url)}:subscribers", user_id)
 
+    # ============ Pincode Operations ============
+
+    async def set_user_pincode(self, user_id: str, pincode: str):
+        await self.redis.set(f"user:{user_id}:pincode", pincode)
+        return True
+
+    async def get_user_pincode(self, user_id: str):
+        return await self.redis.get(f"user:{user_id}:pincode") or settings.DEFAULT_PINCODE
+
+    @tracer.traced("redis.get_subscriber_pincodes")
+    async def get_subscriber_pincodes(self, url: str):
+        """Map each subscriber of a product to the pincode they check stock for.
+
+        Subscriptions made before pincodes were stored per product fall back to
+        the user's default pincode.
+        """
+        subscribers = list(await self.get_subscribers(url))
+        if not subscribers:
+            return {}
+        pincodes = await self.redis.hmget(f"product:{self._url_to_key(url)}:pincodes", subscribers)
+        defaults = await self.redis.mget([f"user:{user_id}:pincode" for user_id in subscribers])
+        return {
+            user_id: pincode or default or settings.DEFAULT_PINCODE
+            for user_id, pincode, default in zip(subscribers, pincodes, defaults)
+        }
+
+    @tracer.traced("redis.get_availability")
+    async def get_availability(self, url: str):
+        """Per-product pincode -> status matrix from the last check."""
+        return await self.redis.hgetall(f"product:{self._url_to_key(url)}:availability")
+
+    @tracer.traced("redis.update_availability")
+    async def update_availability(self, url: str, matrix: dict, pincodes: list[str] = None):
+        """Merge statuses into the matrix, dropping pincodes not in `pincodes` if given."""
+        key = f"product:{self._url_to_key(url)}:availability"
+        if matrix:
+            await self.redis.hset(key, mapping=matrix)
+        if pincodes is not None:
+            stale = [pincode for pincode in await self.redis.hkeys(key) if pincode not in pincodes]
+            if stale:
+                await self.redis.hdel(key, *stale)
+        return True
+
+    # ============ Scheduler Instance Operations ============
+
+    async def register_instance(self, instance_id: str):
+        await self.redis.zadd("scheduler:instances", {instance_id: int(time.time() * 1000)})
+        return True
+
+    async def get_live_instances(self, ttl_seconds: int):
+        cutoff = int((time.time() - ttl_seconds) * 1000)
+        await self.redis.zremrangebyscore("scheduler:instances", "-inf", f"({cutoff}")
+        return await self.redis.zrange("scheduler:instances", 0, -1)
+
+    async def remove_instance(self, instance_id: str):
+        await self.redis.zrem("scheduler:instances", instance_id)
+        return True
+
     async def get_stats(self):
         urls = await self.redis.smembers("products:all")
         total_subscribers = 0
@@ -1,105 +1,207 @@
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 import logging
 import asyncio
 from src.config import get_settings
 from src.services.redis_service import db
 from src.services.stock_checker import checker
 from src.services.notifier import notifier
+from src.services.circuit_breaker import breakers
+from src.services.startup import startup
+from src.services.change_detector import detector
+from src.services.sharding import sharding
+from src.services.asset_cache import asset_cache
+from src.services.tracing import tracer
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 class SchedulerService:
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+        self.scheduler = None
         self.is_running_check = False
 
     def start(self):
         # Prevent double start
-        if self.scheduler.running:
+        if self.scheduler and self.scheduler.running:
             logger.warning("Scheduler already running.")
             return
 
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        from apscheduler.triggers.cron import CronTrigger
+        from apscheduler.triggers.interval import IntervalTrigger
+
         # Schedule check based on config interval
+        self.scheduler = AsyncIOScheduler()
         trigger = CronTrigger(minute=f"*/{settings.CHECK_INTERVAL_MINUTES}")
         self.scheduler.add_job(self.run_check, trigger)
+        if settings.BROWSER_CACHE_ENABLED:
+            self.scheduler.add_job(asset_cache.evict, IntervalTrigger(minutes=settings.BROWSER_CACHE_EVICT_MINUTES))
         self.scheduler.start()
+        sharding.start()
         logger.info(f"⏰ Scheduler started (every {settings.CHECK_INTERVAL_MINUTES} minutes)")
         
-        # Initial check after 10s
+        # Initial check once Redis is reachable
         asyncio.create_task(self._delayed_initial_check())
 
     async def _delayed_initial_check(self):
-        await asyncio.sleep(10)
+        await startup.ready.wait()
+        # Give the Discord login a head start so early changes can be delivered
+        try:
+            await asyncio.wait_for(notifier.bot_ready.wait(), timeout=30)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Discord bot not ready, running initial check anyway")
         await self.run_check()
 
     def stop(self):
-        self.scheduler.shutdown()
+        if self.scheduler:
+            self.scheduler.shutdown()
         logger.info("⏹️ Scheduler stopped")
 
     async def run_check(self):
+        """Sweep this instance's slice of the catalog.
+
+        Returns how many products this instance owned, or None if a sweep was
+        already running.
+        """
         if self.is_running_check:
             logger.warning("⚠️ Check already running, skipping...")
-            return
+            return None
 
         self.is_running_check = True
         logger.info("🔄 Running scheduled stock check...")
+        checked = 0
+        skipped = 0
 
         try:
-            products = await db.get_all_products()
+            await sharding.refresh()
+            total = await db.count_products()
             
-            if not products:
+            if not total:
                 logger.info("📭 No products to check")
-                self.is_running_check = False
-                return
-
-            logger.info(f"📦 Checking {len(products)} product(s)...")
-
-            for product in products:
-                await self._check_product(product)
-                await asyncio.sleep(2)  # Crawl delay
-
-            logger.info("✅ Stock check completed")
+                return 0
+
+            logger.info(f"📦 Streaming shard {sharding.instance_id}'s slice of {total} product(s) across {len(sharding.instances)} instance(s)...")
+
+            tasks = set()
+            # Bounds products in flight; browser checks are paced by the host's breaker
+            in_flight = asyncio.Semaphore(settings.SWEEP_MAX_CONCURRENCY)
+            try:
+                # Only this instance's slice of the catalog, streamed chunk by chunk
+                async for product in db.iter_products(url_filter=sharding.owns):
+                    await in_flight.acquire()
+                    if breakers.for_url(product['url']).is_open():
+                        # Shed load while the storefront is degraded
+                        in_flight.release()
+                        skipped += 1
+                        continue
+                    task = asyncio.create_task(self._bounded_check(product, in_flight))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    checked += 1
+            finally:
+                # Even if the scan fails midway, the sweep isn't over until its checks are
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            if skipped:
+                logger.warning(f"⚠️ Skipped {skipped} product(s) while circuit was open")
+            logger.info(f"✅ Stock check completed ({checked} of {checked + skipped} product(s) owned by this instance)")
 
         except Exception as e:
             logger.error(f"❌ Error during stock check: {e}")
         finally:
             self.is_running_check = False
+        return checked + skipped
 
-    async def _check_product(self, product: dict):
+    async def _bounded_check(self, product: dict, in_flight: asyncio.Semaphore):
         try:
-            url = product['url']
-            old_status = product.get('status')
-            
-            result = await checker.check_stock(url)
-            
-            if result['status'] == 'error':
-                logger.warning(f"⚠️ Error checking {product.get('name')}: {result.get('error')}")
-                return
-
-            new_status = result['status']
-            
-            # Update Redis
-            await db.update_product_status(url, new_status, {
-                "name": result.get('name') or product.get('name'),
-                "imageUrl": result.get('imageUrl') or product.get('imageUrl')
-            })
-
-            # Notify if changed
-            if old_status != new_status and old_status != 'unknown':
-                logger.info(f"📢 Status change: {product.get('name')} - {old_status} -> {new_status}")
-                
-                subscribers = await db.get_subscribers(url)
-                if subscribers:
-                    updated_product = await db.get_product(url)
-                    await notifier.notify_users(list(subscribers), updated_product, old_status, new_status)
+            await self._check_product(product)
+        finally:
+            in_flight.release()
 
-        except Exception as e:
-            logger.error(f"❌ Error checking product {product.get('url')}: {e}")
+    async def _check_product(self, product: dict):
+        with tracer.trace("check_product", url=product.get('url')) as trace:
+            try:
+                url = product['url']
+
+                subscriber_pincodes = await db.get_subscriber_pincodes(url)
+                pincodes = sorted(set(subscriber_pincodes.values())) or [settings.DEFAULT_PINCODE]
+
+                # Skip the browser when the cheap pre-check sees no change. The data
+                # response isn't pincode-aware, so other pincodes always get a full check.
+                fingerprint = None
+                if pincodes == [settings.DEFAULT_PINCODE]:
+                    with tracer.span("precheck"):
+                        changed, fingerprint = await detector.check(url)
+                    if not changed:
+                        await db.touch_product(url)
+                        return
+                old_matrix = await db.get_availability(url)
+
+                with tracer.span("browser"):
+                    results = await checker.check_stock_matrix(url, pincodes)
+                bytes_fetched = sum(r.get('cache', {}).get('bytesFetched', 0) for r in results.values())
+                trace.attrs["bytesFetched"] = bytes_fetched
+                logger.debug(f"📶 {url}: {bytes_fetched} byte(s) fetched across {len(pincodes)} pincode(s)")
+
+                matrix = {}
+                for pincode, result in results.items():
+                    if result['status'] == 'error':
+                        logger.warning(f"⚠️ Error checking {product.get('name')} at {pincode}: {result.get('error')}")
+                    else:
+                        matrix[pincode] = result['status']
+
+                if not matrix:
+                    trace.error = "All pincode checks failed"
+                    return
+
+                result = next(r for r in results.values() if r['status'] != 'error')
+                new_status = self._summarize(matrix)
+
+                # Update Redis
+                await db.update_product_status(url, new_status, {
+                    "name": result.get('name') or product.get('name'),
+                    "imageUrl": result.get('imageUrl') or product.get('imageUrl')
+                })
+                # Pincodes nobody subscribes with any more drop out of the matrix
+                await db.update_availability(url, matrix, pincodes)
+                if len(matrix) == len(results):
+                    await detector.commit(url, fingerprint)
+
+                # Notify only subscribers whose own pincode changed
+                updated_product = None
+                for pincode, new_pincode_status in matrix.items():
+                    old_pincode_status = old_matrix.get(pincode)
+                    if old_pincode_status is None:
+                        # Products tracked before per-pincode checks were checked at the default pincode
+                        old_pincode_status = product.get('status') if pincode == settings.DEFAULT_PINCODE else 'unknown'
+
+                    if old_pincode_status == new_pincode_status or old_pincode_status == 'unknown':
+                        continue
+
+                    logger.info(f"📢 Status change: {product.get('name')} @ {pincode} - {old_pincode_status} -> {new_pincode_status}")
+
+                    user_ids = [user_id for user_id, user_pincode in subscriber_pincodes.items() if user_pincode == pincode]
+                    if user_ids:
+                        if updated_product is None:
+                            updated_product = await db.get_product(url)
+                        with tracer.span("notify"):
+                            await notifier.notify_users(user_ids, updated_product, old_pincode_status, new_pincode_status, pincode=pincode)
+
+            except Exception as e:
+                trace.error = str(e)
+                logger.error(f"❌ Error checking product {product.get('url')}: {e}")
+
+    def _summarize(self, matrix: dict) -> str:
+        """Collapse a pincode matrix to the product-level status shown on the dashboard."""
+        statuses = set(matrix.values())
+        if 'in_stock' in statuses:
+            return 'in_stock'
+        if 'out_of_stock' in statuses:
+            return 'out_of_stock'
+        return 'unknown'
 
     async def force_check(self):
+        """Sweep this instance's slice now; other instances keep their own schedule."""
         logger.info("🔄 Forcing immediate stock check...")
-        await self.run_check()
+        return await self.run_check()
 
 scheduler = SchedulerService()
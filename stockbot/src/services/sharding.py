@@ -0,0 +1,86 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import socket
+from src.config import get_settings
+from src.services.redis_service import db
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes."""
+
+    def __init__(self, nodes: list[str], replicas: int):
+        self.ring = sorted(
+            (self._hash(f"{node}#{i}"), node)
+            for node in nodes
+            for i in range(replicas)
+        )
+        self.keys = [point for point, _ in self.ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+    def get_node(self, key: str):
+        if not self.ring:
+            return None
+        index = bisect.bisect(self.keys, self._hash(key)) % len(self.keys)
+        return self.ring[index][1]
+
+class ShardCoordinator:
+    """Splits the product catalog across live scheduler instances.
+
+    Each instance heartbeats into Redis and builds the same ring from the set
+    of live instances, so every product has exactly one owner without a
+    central coordinator. Joins and departures only move the slices adjacent
+    to the changed instance.
+    """
+
+    def __init__(self):
+        self.instance_id = settings.INSTANCE_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self.instances = [self.instance_id]
+        self.ring = HashRing(self.instances, settings.SHARD_VIRTUAL_NODES)
+        self._task = None
+
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.warning(f"⚠️ Shard heartbeat failed: {e}")
+            await asyncio.sleep(settings.SHARD_HEARTBEAT_SECONDS)
+
+    async def heartbeat(self):
+        await db.register_instance(self.instance_id)
+        await self.refresh()
+
+    async def refresh(self):
+        instances = set(await db.get_live_instances(settings.SHARD_INSTANCE_TTL_SECONDS))
+        instances.add(self.instance_id)
+        instances = sorted(instances)
+        if instances != self.instances:
+            logger.info(f"🧩 Rebalancing shards across {len(instances)} instance(s): {', '.join(instances)}")
+            self.instances = instances
+            self.ring = HashRing(instances, settings.SHARD_VIRTUAL_NODES)
+
+    def owns(self, url: str) -> bool:
+        return self.ring.get_node(url) == self.instance_id
+
+    async def leave(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        try:
+            await db.remove_instance(self.instance_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to deregister instance {self.instance_id}: {e}")
+
+sharding = ShardCoordinator()
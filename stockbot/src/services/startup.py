@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class StartupProfile:
+    """Times each startup phase and tracks readiness for the API."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases = {}
+        self.failed = {}
+        self.ready_after = None
+        self.ready = asyncio.Event()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.failed[name] = str(e)
+            raise
+        finally:
+            self.phases[name] = round(time.perf_counter() - started, 3)
+
+    async def run(self, name: str, coro) -> bool:
+        """Await a startup step as a timed phase, logging instead of raising."""
+        try:
+            with self.phase(name):
+                await coro
+            self.failed.pop(name, None)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Startup phase '{name}' failed: {e}")
+            return False
+
+    def mark_ready(self):
+        if self.ready.is_set():
+            return
+        self.ready_after = round(time.perf_counter() - self.started_at, 3)
+        self.ready.set()
+        logger.info(f"✅ Ready to serve after {self.ready_after}s")
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready.is_set(),
+            "readyAfter": self.ready_after,
+            "phases": self.phases,
+            "failed": self.failed,
+        }
+
+    def log_report(self):
+        lines = [f"  {name:<16} {seconds:>7.3f}s" for name, seconds in self.phases.items()]
+        logger.info("⏱️ Startup profile:\n" + "\n".join(lines))
+
+startup = StartupProfile()
@@ -1,6 +1,13 @@
-from playwright.async_api import async_playwright
+from collections import OrderedDict
+import asyncio
 import logging
+import os
+import re
+import time
 from src.config import get_settings
+from src.services.circuit_breaker import breakers
+from src.services.asset_cache import asset_cache
+from src.services.tracing import tracer
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -9,15 +16,41 @@ class StockChecker:
     def __init__(self):
         self.playwright = None
         self.browser = None
+        # One warm context per pincode, least recently used first
+        self.contexts = OrderedDict()
+        self._pages_in_use = {}
+        self._context_lock = asyncio.Lock()
+        # Pages per context are capped, and a fresh context runs the pincode flow alone
+        self._context_slots = {}
+        self._locate_locks = {}
+        self._located = set()
+        self._pending_releases = set()
+        self._start_lock = asyncio.Lock()
 
     async def start(self):
-        if not self.playwright:
+        # Prelaunch at startup and lazy launch on first check may race
+        async with self._start_lock:
+            if self.browser:
+                return
+            from playwright.async_api import async_playwright
             self.playwright = await async_playwright().start()
-            # Launch chromium. Set headless=True for production
-            self.browser = await self.playwright.chromium.launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
+            try:
+                # Launch chromium. Set headless=True for production
+                self.browser = await self.playwright.chromium.launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
+            except Exception:
+                # Leave nothing half-started so the next check retries the launch
+                await self.playwright.stop()
+                self.playwright = None
+                raise
             logger.info("🌐 Playwright browser initialized")
 
     async def stop(self):
+        for context in self.contexts.values():
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self.contexts.clear()
         if self.browser:
             await self.browser.close()
         if self.playwright:
@@ -32,105 +65,301 @@ class StockChecker:
         except:
             return False
 
-    async def check_stock(self, url: str):
+    def is_valid_pincode(self, pincode: str) -> bool:
+        return bool(pincode) and re.fullmatch(r'[1-9][0-9]{5}', pincode) is not None
+
+    async def _get_context(self, pincode: str):
+        """Return the warm context for a pincode, creating it if needed.
+
+        The storefront remembers the delivery location in cookies, so once the
+        pincode flow has run in a context every later page in it skips the popup.
+        """
+        async with self._context_lock:
+            if pincode in self.contexts:
+                self.contexts.move_to_end(pincode)
+                return self.contexts[pincode]
+
+            # Evict idle contexts beyond the limit
+            for old_pincode in list(self.contexts):
+                if len(self.contexts) < settings.MAX_PINCODE_CONTEXTS:
+                    break
+                if self._pages_in_use.get(old_pincode):
+                    continue
+                await self._discard_context(old_pincode)
+
+            context = await self.browser.new_context(
+                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                viewport={'width': 1280, 'height': 800}
+            )
+            if settings.TRACE_PLAYWRIGHT:
+                # Tracing runs for the context's lifetime; each check records a chunk
+                await context.tracing.start(screenshots=True, snapshots=True)
+                await context.tracing.stop_chunk()
+            self.contexts[pincode] = context
+            return context
+
+    def _context_slot(self, pincode: str) -> asyncio.Semaphore:
+        if pincode not in self._context_slots:
+            self._context_slots[pincode] = asyncio.Semaphore(settings.MAX_PAGES_PER_CONTEXT)
+        return self._context_slots[pincode]
+
+    def _locate_lock(self, pincode: str) -> asyncio.Lock:
+        if pincode not in self._locate_locks:
+            self._locate_locks[pincode] = asyncio.Lock()
+        return self._locate_locks[pincode]
+
+    async def _discard_context(self, pincode: str):
+        self._located.discard(pincode)
+        context = self.contexts.pop(pincode, None)
+        if context:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def check_stock(self, url: str, pincode: str = None):
+        pincode = pincode or settings.DEFAULT_PINCODE
         if not self.browser:
-            await self.start()
-        
-        context = await self.browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            viewport={'width': 1280, 'height': 800}
-        )
-        page = await context.new_page()
+            try:
+                await self.start()
+            except Exception as e:
+                logger.error(f"Failed to launch browser: {e}")
+                return {
+                    "status": "error",
+                    "error": f"Browser launch failed: {e}",
+                    "name": "Unknown",
+                    "imageUrl": ""
+                }
+
+        breaker = breakers.for_url(url)
+
+        # Checks sharing a pincode are batched as pages of its warm context
+        async with self._context_slot(pincode):
+            # Every browser check holds one of the host's AIMD slots
+            await breaker.acquire()
+            allowed, probe = breaker.allow_request()
+            if not allowed:
+                await breaker.release()
+                return {
+                    "status": "error",
+                    "error": f"Circuit open for {breaker.host}, skipping check",
+                    "name": "Unknown",
+                    "imageUrl": ""
+                }
+
+            locate_lock = None if pincode in self._located else self._locate_lock(pincode)
+            self._pages_in_use[pincode] = self._pages_in_use.get(pincode, 0) + 1
+            ok = False
+            started = None
+            try:
+                if locate_lock:
+                    await locate_lock.acquire()
+                started = time.monotonic()
+                with tracer.trace("check_stock", url=url, pincode=pincode) as span:
+                    result = await self._check_in_context(url, pincode)
+                    ok = result['status'] != 'error'
+                    span.attrs.update(result.get('cache') or {})
+                    if not ok:
+                        span.error = result['error']
+                        # A failure at any one pincode fails the whole product trace
+                        tracer.fail(f"{pincode}: {result['error']}")
+                    return result
+            finally:
+                if locate_lock:
+                    locate_lock.release()
+                self._pages_in_use[pincode] -= 1
+                # Always record, or a lost half-open probe would keep the circuit open forever
+                breaker.record(ok, time.monotonic() - started if started else 0.0, probe=probe)
+                # The slot stays taken through the crawl delay without blocking the caller
+                task = asyncio.create_task(breaker.release_after(breaker.delay))
+                self._pending_releases.add(task)
+                task.add_done_callback(self._pending_releases.discard)
+
+    async def _set_location(self, page, pincode: str) -> bool:
+        """Run the pincode popup if needed and confirm the page is located at pincode."""
+        if await self._location_confirmed(page, pincode, timeout=2000):
+            return True
+
+        # Not located yet, so the popup must show up; a timeout here fails the check
+        pincode_input = page.locator('#search')
+        await pincode_input.wait_for(state='visible', timeout=10000)
+        logger.info("Pincode popup detected, entering pincode...")
+        await pincode_input.fill(pincode)
+        await page.wait_for_timeout(1000)
+        await page.keyboard.press('Enter')
+        await page.wait_for_timeout(2000)
+
+        # Click first suggestion if exists
+        suggestion = page.locator('.pac-item').first
+        if await suggestion.count() > 0 and await suggestion.is_visible():
+            await suggestion.click()
+            await page.wait_for_timeout(2000)
+
+        return await self._location_confirmed(page, pincode, timeout=10000)
 
+    async def _location_confirmed(self, page, pincode: str, timeout: int) -> bool:
+        # The header's delivery location label shows the pincode once it is set
         try:
+            await page.get_by_text(pincode).first.wait_for(state='visible', timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _count_bytes(self, request, stats: dict):
+        # Requests the asset cache handles are counted by its route handler
+        if settings.BROWSER_CACHE_ENABLED and asset_cache.handles(request):
+            return
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        stats["bytesFetched"] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+
+    async def check_stock_matrix(self, url: str, pincodes: list[str]):
+        """Check one product across several pincodes, one warm context each."""
+        results = await asyncio.gather(*(self.check_stock(url, pincode) for pincode in pincodes))
+        return dict(zip(pincodes, results))
+
+    async def _check_in_context(self, url: str, pincode: str):
+        context = None
+        page = None
+        # Network bytes for the whole page load, plus the asset cache's share
+        cache_stats = {"hits": 0, "misses": 0, "bytesFetched": 0, "bytesServed": 0}
+        size_tasks = []
+        started = time.monotonic()
+        failed = False
+        # Concurrent pages would share one chunk, so only trace lone checks
+        trace_chunk = settings.TRACE_PLAYWRIGHT and self._pages_in_use.get(pincode) == 1
+
+        try:
+            context = await self._get_context(pincode)
+            if trace_chunk:
+                await context.tracing.start_chunk()
+            page = await context.new_page()
+            page.on("requestfinished", lambda request: size_tasks.append(
+                asyncio.create_task(self._count_bytes(request, cache_stats))
+            ))
+
+            if settings.BROWSER_CACHE_ENABLED:
+                async def serve_cached(route):
+                    await asset_cache.handle_route(route, cache_stats)
+                # Documents and XHR never take a Python round trip
+                await page.route(asset_cache.is_static_url, serve_cached)
+
             # Set default timeout to 30s
             page.set_default_timeout(30000)
             
-            await page.goto(url, wait_until='networkidle')
-            await page.wait_for_timeout(3000) # Wait for Vue hydration
+            with tracer.span("navigate", pincode=pincode):
+                await page.goto(url, wait_until='networkidle')
+                await page.wait_for_timeout(3000) # Wait for Vue hydration
 
-            # Handle Pincode if Present
-            try:
-                pincode_input = page.locator('#search')
-                if await pincode_input.count() > 0 and await pincode_input.is_visible():
-                    logger.info("Pincode popup detected, entering pincode...")
-                    await pincode_input.fill(settings.DEFAULT_PINCODE)
-                    await page.wait_for_timeout(1000)
-                    await page.keyboard.press('Enter')
-                    await page.wait_for_timeout(2000)
-                    
-                    # Click first suggestion if exists
-                    suggestion = page.locator('.pac-item').first
-                    if await suggestion.count() > 0 and await suggestion.is_visible():
-                         await suggestion.click()
-                         await page.wait_for_timeout(2000)
-            except Exception as e:
-                logger.warning(f"Pincode handling issue: {e}")
+            # Make sure the page is located at this pincode before reading stock
+            with tracer.span("pincode", pincode=pincode):
+                if not await self._set_location(page, pincode):
+                    raise RuntimeError(f"Could not confirm delivery location {pincode}")
 
             # Extract Data
+            with tracer.span("extract", pincode=pincode):
+                # Product Name
+                name = await page.title()
+                h1 = page.locator('h1')
+                if await h1.count() > 0:
+                    name = await h1.text_content()
+                name = name.strip().split('|')[0].strip()
+
+                # Image
+                image_url = ""
+                img = page.locator('.product-image img').first
+                if await img.count() > 0:
+                     image_url = await img.get_attribute('src')
             
-            # Product Name
-            name = await page.title()
-            h1 = page.locator('h1')
-            if await h1.count() > 0:
-                name = await h1.text_content()
-            name = name.strip().split('|')[0].strip()
-
-            # Image
-            image_url = ""
-            img = page.locator('.product-image img').first
-            if await img.count() > 0:
-                 image_url = await img.get_attribute('src')
-            
-            # Stock Status Logic
-            status = 'unknown'
-            is_out_of_stock = False
+                # Stock Status Logic
+                status = 'unknown'
+                is_out_of_stock = False
             
-            # Primary Indicators:
-            # 1. 'Notify Me' button (.product_enquiry) - Only present when out of stock
-            notify_me = page.locator('.product_enquiry')
+                # Primary Indicators:
+                # 1. 'Notify Me' button (.product_enquiry) - Only present when out of stock
+                notify_me = page.locator('.product_enquiry')
             
-            # 2. 'Add to Cart' button (.add-to-cart) - Present on both, but disabled when out of stock
-            add_to_cart = page.locator('.add-to-cart').first
+                # 2. 'Add to Cart' button (.add-to-cart) - Present on both, but disabled when out of stock
+                add_to_cart = page.locator('.add-to-cart').first
             
-            # 3. 'Sold Out' banner specifically in main product area (alert-danger banner)
-            sold_out_banner = page.locator('.alert.alert-danger:has-text("Sold Out")')
-
-            if await notify_me.count() > 0 and await notify_me.is_visible():
-                is_out_of_stock = True
-            elif await sold_out_banner.count() > 0:
-                # Banner exists, check visibility
-                is_out_of_stock = await sold_out_banner.is_visible()
-            elif await add_to_cart.count() > 0:
-                # Check for 'disabled' class or attribute
-                classes = await add_to_cart.get_attribute('class') or ""
-                disabled_attr = await add_to_cart.get_attribute('disabled') or ""
-                if 'disabled' in classes.lower() or disabled_attr == 'true' or disabled_attr == '1':
+                # 3. 'Sold Out' banner specifically in main product area (alert-danger banner)
+                sold_out_banner = page.locator('.alert.alert-danger:has-text("Sold Out")')
+
+                if await notify_me.count() > 0 and await notify_me.is_visible():
                     is_out_of_stock = True
-                else:
-                    status = 'in_stock'
+                elif await sold_out_banner.count() > 0:
+                    # Banner exists, check visibility
+                    is_out_of_stock = await sold_out_banner.is_visible()
+                elif await add_to_cart.count() > 0:
+                    # Check for 'disabled' class or attribute
+                    classes = await add_to_cart.get_attribute('class') or ""
+                    disabled_attr = await add_to_cart.get_attribute('disabled') or ""
+                    if 'disabled' in classes.lower() or disabled_attr == 'true' or disabled_attr == '1':
+                        is_out_of_stock = True
+                    else:
+                        status = 'in_stock'
             
-            if is_out_of_stock:
-                status = 'out_of_stock'
-            elif status == 'unknown' and await add_to_cart.count() > 0:
-                status = 'in_stock'
+                if is_out_of_stock:
+                    status = 'out_of_stock'
+                elif status == 'unknown' and await add_to_cart.count() > 0:
+                    status = 'in_stock'
 
+            self._located.add(pincode)
             return {
                 "status": status,
                 "name": name,
                 "imageUrl": image_url,
-                "error": None
+                "error": None,
+                "cache": cache_stats
             }
 
         except Exception as e:
-            logger.error(f"Error checking stock for {url}: {e}")
+            logger.error(f"Error checking stock for {url} ({pincode}): {e}")
+            failed = True
+            # The next check reruns the pincode flow on its own
+            self._located.discard(pincode)
             return {
                 "status": "error",
                 "error": str(e),
                 "name": "Unknown",
-                "imageUrl": ""
+                "imageUrl": "",
+                "cache": cache_stats
             }
         finally:
-            await context.close()
+            # Settle byte counts before the caller reads them
+            await asyncio.gather(*size_tasks, return_exceptions=True)
+            if page:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            if trace_chunk and context:
+                await self._save_trace_chunk(context, pincode, failed or tracer.is_slow(time.monotonic() - started))
+            # Start this pincode over with a fresh context next time
+            if failed and self._pages_in_use.get(pincode, 0) <= 1:
+                await self._discard_context(pincode)
+
+    async def _save_trace_chunk(self, context, pincode: str, keep: bool):
+        """Keep the Playwright trace of a slow or failing check, drop the rest."""
+        try:
+            if not keep:
+                await context.tracing.stop_chunk()
+                return
+
+            os.makedirs(settings.TRACE_DIR, exist_ok=True)
+            path = os.path.join(settings.TRACE_DIR, f"{int(time.time() * 1000)}-{pincode}.zip")
+            await context.tracing.stop_chunk(path=path)
+            trace = tracer.current()
+            if trace:
+                trace.playwright_trace = path
+
+            # Only the newest traces are kept on disk
+            files = sorted(os.listdir(settings.TRACE_DIR))
+            for name in files[:-settings.TRACE_MAX_FILES]:
+                os.remove(os.path.join(settings.TRACE_DIR, name))
+        except Exception as e:
+            logger.warning(f"Failed to save Playwright trace: {e}")
 
 checker = StockChecker()
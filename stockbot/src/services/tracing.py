@@ -0,0 +1,127 @@
+from collections import deque
+from contextlib import contextmanager
+import contextvars
+import functools
+import itertools
+import random
+import time
+from src.config import get_settings
+
+settings = get_settings()
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_trace_ids = itertools.count(1)
+
+class Span:
+    def __init__(self, name: str, offset: float, attrs: dict = None):
+        self.name = name
+        self.offset = offset
+        self.attrs = attrs or {}
+        self.duration = None
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "offset": round(self.offset, 4),
+            "duration": round(self.duration or 0, 4),
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+class Trace(Span):
+    def __init__(self, name: str, attrs: dict, sampled: bool):
+        super().__init__(name, 0.0, attrs)
+        self.id = next(_trace_ids)
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.started_at = int(time.time() * 1000)
+        self.spans = []
+        self.playwright_trace = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            **super().to_dict(),
+            "startedAt": self.started_at,
+            "spans": [span.to_dict() for span in self.spans],
+            "playwrightTrace": self.playwright_trace,
+        }
+
+class Tracer:
+    """Per-check tracer with a bounded ring buffer of recent traces.
+
+    Spans are cheap, so every trace is timed; only a TRACE_SAMPLE_RATE share of
+    healthy traces is kept, while slow or failing traces are always kept.
+    """
+
+    def __init__(self):
+        self.traces = deque(maxlen=settings.TRACE_BUFFER_SIZE)
+
+    def current(self):
+        return _current_trace.get()
+
+    @contextmanager
+    def trace(self, name: str, **attrs):
+        """Start a root trace, or a span if one is already active."""
+        if _current_trace.get() is not None:
+            with self.span(name, **attrs) as span:
+                yield span
+            return
+
+        trace = Trace(name, attrs, random.random() < settings.TRACE_SAMPLE_RATE)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        except Exception as e:
+            trace.error = str(e)
+            raise
+        finally:
+            _current_trace.reset(token)
+            trace.duration = time.perf_counter() - trace.started
+            if trace.sampled or trace.error or self.is_slow(trace.duration):
+                self.traces.append(trace)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        trace = _current_trace.get()
+        started = time.perf_counter()
+        span = Span(name, started - trace.started if trace else 0.0, attrs)
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            self.fail(f"{name}: {e}")
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            if trace:
+                trace.spans.append(span)
+
+    def fail(self, message: str):
+        """Mark the current root trace as failed so it is always kept."""
+        trace = _current_trace.get()
+        if trace is not None and trace.error is None:
+            trace.error = message
+
+    def traced(self, name: str):
+        """Decorator recording an async function call as a span."""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def is_slow(self, seconds: float) -> bool:
+        return seconds >= settings.TRACE_SLOW_SECONDS
+
+    def recent(self, slow_only: bool = False, limit: int = 50) -> list[dict]:
+        traces = [
+            trace for trace in reversed(self.traces)
+            if not slow_only or trace.error or self.is_slow(trace.duration)
+        ]
+        return [trace.to_dict() for trace in traces[:limit]]
+
+tracer = Tracer()
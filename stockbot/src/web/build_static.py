@@ -0,0 +1,64 @@
+"""Build the dashboard into src/web/dist.
+
+Assets get content-hashed names so they can be cached as immutable,
+index.html is rewritten to point at them, and every text file gets .gz
+(and .br when brotli is installed) siblings for PrecompressedStaticFiles.
+
+    python -m src.web.build_static
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WEB_DIR = os.path.dirname(__file__)
+SOURCE_DIR = os.path.join(WEB_DIR, "static")
+DIST_DIR = os.path.join(WEB_DIR, "dist")
+
+PRECOMPRESS_EXTENSIONS = {'.html', '.js', '.css', '.svg', '.json'}
+
+def _write(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+    if os.path.splitext(path)[1] in PRECOMPRESS_EXTENSIONS:
+        with open(f"{path}.gz", 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli:
+            with open(f"{path}.br", 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+
+def build():
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    for name in sorted(os.listdir(SOURCE_DIR)):
+        path = os.path.join(SOURCE_DIR, name)
+        if name == 'index.html' or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+        _write(os.path.join(DIST_DIR, hashed), data)
+        manifest[name] = hashed
+
+    with open(os.path.join(SOURCE_DIR, 'index.html'), encoding='utf-8') as f:
+        html = f.read()
+    for name, hashed in manifest.items():
+        html = html.replace(f'"{name}"', f'"{hashed}"')
+    _write(os.path.join(DIST_DIR, 'index.html'), html.encode('utf-8'))
+
+    with open(os.path.join(DIST_DIR, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Built {len(manifest)} asset(s) into {DIST_DIR}")
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,127 @@
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import NotModifiedResponse
+import gzip
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+# Build output names look like app.<10 hex chars>.js (see build_static.py)
+HASHED_ASSET = re.compile(r'\.[0-9a-f]{10}\.[a-z0-9]+$')
+
+def negotiate_encoding(accept_encoding: str):
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, or None."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token.lower()] = quality
+
+    # Highest q wins, brotli on a tie; q=0 means not acceptable
+    best, best_quality = None, 0.0
+    for name in (('br', 'gzip') if brotli else ('gzip',)):
+        quality = accepted.get(name, accepted.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=6)
+
+class CompressionMiddleware:
+    """Compress API responses with brotli or gzip as the client allows."""
+
+    def __init__(self, app, minimum_size: int = 500, paths: tuple = ('/api/',)):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+
+        async def buffered_send(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    await self._send(send, start, b''.join(chunks), encoding)
+                return
+            await send(message)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _send(self, send, start, body: bytes, encoding: str):
+        headers = MutableHeaders(raw=start['headers'])
+        content_type = headers.get('content-type', '')
+
+        if (
+            len(body) >= self.minimum_size
+            and 'content-encoding' not in headers
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        ):
+            body = compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(body))
+            headers.add_vary_header('Accept-Encoding')
+
+        await send(start)
+        await send({'type': 'http.response.body', 'body': body})
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Serve .br/.gz siblings built ahead of time and cache hashed assets forever."""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(request_headers.get('accept-encoding', ''))
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding)
+        variant = f"{full_path}{suffix}" if suffix else None
+
+        if not variant or not os.path.isfile(variant):
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            self._set_cache_control(response, full_path)
+            return response
+
+        media_type = mimetypes.guess_type(str(full_path))[0] or 'application/octet-stream'
+        response = FileResponse(variant, status_code=status_code, media_type=media_type, stat_result=os.stat(variant))
+        response.headers['Content-Encoding'] = encoding
+        response.headers.add_vary_header('Accept-Encoding')
+        self._set_cache_control(response, full_path)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _set_cache_control(self, response, full_path):
+        if HASHED_ASSET.search(os.path.basename(str(full_path))):
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+
@@ -1,51 +1,84 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel
+import hmac
 import os
 import time
 
+from src.config import get_settings
 from src.services.redis_service import db
 from src.services.stock_checker import checker
 from src.services.scheduler import scheduler
+from src.services.circuit_breaker import breakers
+from src.services.startup import startup
+from src.services.change_detector import detector
+from src.services.asset_cache import asset_cache
+from src.services.tracing import tracer
+from src.services.profiler import profiler
+from src.services.sharding import sharding
 
+settings = get_settings()
+# Routes return ORJSONResponse directly: orjson serializes the large product
+# listings several times faster than json, and FastAPI skips jsonable_encoder
 router = APIRouter()
 
 # Pydantic Models
 class ProductRequest(BaseModel):
     url: str
     userId: str | None = None
+    pincode: str | None = None
 
 # API Routes
 @router.get("/api/health")
 async def health():
-    return {
+    return ORJSONResponse({
         "success": True, 
         "status": "ok", 
-        "uptime": time.process_time()
-    }
+        "uptime": time.process_time(),
+        "breakers": breakers.snapshot(),
+        "precheck": detector.stats,
+        "assetCache": asset_cache.snapshot()
+    })
+
+@router.get("/api/live")
+async def live():
+    return ORJSONResponse({"success": True, "status": "alive"})
+
+@router.get("/api/ready")
+async def ready():
+    report = startup.report()
+    if not report["ready"]:
+        return ORJSONResponse(status_code=503, content={"success": False, **report})
+    return ORJSONResponse({"success": True, **report})
 
 @router.get("/api/products")
 async def get_products():
     products = await db.get_all_products()
-    return {"success": True, "count": len(products), "products": products}
+    return ORJSONResponse({"success": True, "count": len(products), "products": products})
 
 @router.post("/api/products")
 async def add_product(req: ProductRequest):
     if not checker.is_valid_amul_url(req.url):
         raise HTTPException(status_code=400, detail="Invalid URL")
+    if req.pincode and not checker.is_valid_pincode(req.pincode):
+        raise HTTPException(status_code=400, detail="Invalid pincode")
+
+    pincode = req.pincode or (await db.get_user_pincode(req.userId) if req.userId else settings.DEFAULT_PINCODE)
         
-    result = await checker.check_stock(req.url)
+    result = await checker.check_stock(req.url, pincode)
     if result['status'] == 'error':
         raise HTTPException(status_code=400, detail=result.get('error'))
         
-    await db.add_product(req.url, result)
+    if not await db.get_product(req.url):
+        await db.add_product(req.url, result)
+    await db.update_availability(req.url, {pincode: result['status']})
     
     if req.userId:
-        await db.subscribe_user(req.userId, req.url)
+        await db.subscribe_user(req.userId, req.url, pincode)
         
     product = await db.get_product(req.url)
-    return {"success": True, "product": product}
+    return ORJSONResponse({"success": True, "product": product})
 
 @router.delete("/api/products")
 async def remove_product(req: ProductRequest):
@@ -55,22 +88,60 @@ async def remove_product(req: ProductRequest):
         # Admin force remove
         await db.remove_product(req.url)
         
-    return {"success": True, "message": "Product removed"}
+    return ORJSONResponse({"success": True, "message": "Product removed"})
 
 @router.get("/api/status")
-async def check_status(url: str):
+async def check_status(url: str, pincode: str | None = None):
     if not checker.is_valid_amul_url(url):
          raise HTTPException(status_code=400, detail="Invalid URL")
+    if pincode and not checker.is_valid_pincode(pincode):
+         raise HTTPException(status_code=400, detail="Invalid pincode")
     
-    result = await checker.check_stock(url)
-    return {"success": True, "url": url, **result}
+    pincode = pincode or settings.DEFAULT_PINCODE
+    result = await checker.check_stock(url, pincode)
+    return ORJSONResponse({"success": True, "url": url, "pincode": pincode, **result})
 
 @router.get("/api/stats")
 async def get_stats():
     stats = await db.get_stats()
-    return {"success": True, **stats}
+    return ORJSONResponse({"success": True, **stats})
 
 @router.post("/api/check")
 async def force_check():
-    await scheduler.force_check()
-    return {"success": True, "message": "Check initiated"}
+    # Only this instance's shard is swept; with several instances the rest of
+    # the catalog is checked on their own schedules
+    owned = await scheduler.force_check()
+    if owned is None:
+        return ORJSONResponse({"success": False, "message": "Check already running"}, status_code=409)
+    return ORJSONResponse({
+        "success": True,
+        "message": f"Checked {owned} product(s) owned by this instance",
+        "instance": sharding.instance_id,
+        "instances": len(sharding.instances)
+    })
+
+# Admin Routes
+async def require_admin(x_admin_token: str | None = Header(default=None)):
+    # Admin endpoints stay closed until a token is configured
+    if not settings.ADMIN_TOKEN or not x_admin_token:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@router.get("/api/admin/traces", dependencies=[Depends(require_admin)])
+async def get_traces(slowOnly: bool = True, limit: int = 50):
+    traces = tracer.recent(slow_only=slowOnly, limit=limit)
+    return ORJSONResponse({"success": True, "count": len(traces), "traces": traces})
+
+@router.post("/api/admin/profile", dependencies=[Depends(require_admin)])
+async def run_profile(seconds: float = 10):
+    if profiler.is_running():
+        raise HTTPException(status_code=409, detail="Profile already running")
+    seconds = max(1, min(seconds, settings.PROFILE_MAX_SECONDS))
+    result = await profiler.profile(seconds)
+    return ORJSONResponse({"success": True, **result})
+
+@router.get("/api/admin/tasks", dependencies=[Depends(require_admin)])
+async def get_tasks():
+    tasks = profiler.task_snapshot()
+    return ORJSONResponse({"success": True, "count": len(tasks), "tasks": tasks})
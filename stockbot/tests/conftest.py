@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Settings are read at import time; tests never talk to Discord or Redis
+os.environ.setdefault("DISCORD_TOKEN", "test-token")
+os.environ.setdefault("DISCORD_CLIENT_ID", "test-client")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
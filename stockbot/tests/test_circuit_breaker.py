@@ -0,0 +1,69 @@
+import time
+
+from src.services.circuit_breaker import CircuitBreaker, settings
+
+def trip(breaker):
+    for _ in range(settings.BREAKER_MIN_CALLS):
+        breaker.record(False, 0.0)
+
+def cool_down(breaker):
+    breaker.opened_at = time.monotonic() - breaker.open_seconds
+
+def test_opens_after_failure_threshold():
+    breaker = CircuitBreaker("shop.amul.com")
+    trip(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() == (False, False)
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("shop.amul.com")
+    for _ in range(settings.BREAKER_MIN_CALLS):
+        breaker.record(True, settings.BREAKER_SLOW_CALL_SECONDS)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_single_probe_after_cool_down():
+    breaker = CircuitBreaker("shop.amul.com")
+    trip(breaker)
+    cool_down(breaker)
+    assert breaker.allow_request() == (True, True)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() == (False, False)
+
+def test_probe_success_closes():
+    breaker = CircuitBreaker("shop.amul.com")
+    trip(breaker)
+    cool_down(breaker)
+    breaker.allow_request()
+    breaker.record(True, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() == (True, False)
+
+def test_probe_failure_reopens_with_backoff():
+    breaker = CircuitBreaker("shop.amul.com")
+    trip(breaker)
+    cool_down(breaker)
+    breaker.allow_request()
+    breaker.record(False, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.open_seconds == min(settings.BREAKER_OPEN_SECONDS * 2, settings.BREAKER_MAX_OPEN_SECONDS)
+
+def test_stale_call_does_not_settle_half_open():
+    breaker = CircuitBreaker("shop.amul.com")
+    trip(breaker)
+    cool_down(breaker)
+    breaker.allow_request()
+    # A check started before the trip finishes during the probe
+    breaker.record(True, 0.1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.probe_in_flight
+    breaker.record(False, 0.1, probe=True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_aimd_pacing():
+    breaker = CircuitBreaker("shop.amul.com")
+    for _ in range(3):
+        breaker.record(True, 0.1)
+    assert breaker.concurrency == min(4, settings.SWEEP_MAX_CONCURRENCY)
+    breaker.record(False, 0.1)
+    assert breaker.concurrency == min(4, settings.SWEEP_MAX_CONCURRENCY) // 2
+    assert breaker.delay == min(settings.SWEEP_MIN_DELAY_SECONDS * 2, settings.SWEEP_MAX_DELAY_SECONDS)
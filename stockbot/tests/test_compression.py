@@ -0,0 +1,32 @@
+import pytest
+
+from src.web import compression
+from src.web.compression import negotiate_encoding
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.1, gzip", "gzip"),
+    ("gzip;q=0.5, br;q=0.5", "br"),
+    ("br;q=0, gzip;q=0", None),
+    ("*", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiate_with_brotli(with_brotli, header, expected):
+    assert negotiate_encoding(header) == expected
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", "gzip"),
+    ("br", None),
+    ("*;q=0.5", "gzip"),
+])
+def test_negotiate_without_brotli(without_brotli, header, expected):
+    assert negotiate_encoding(header) == expected
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from src.services.notifier import NotifierService, _pack, settings
+
+def change(url, old, new, pincode="110001"):
+    return {"product": {"url": url, "name": url}, "old": old, "new": new, "pincode": pincode}
+
+@pytest.fixture
+def notifier(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFY_DIGEST_WINDOW_SECONDS", 60)
+    monkeypatch.setattr(settings, "NOTIFY_IMMEDIATE_IN_STOCK", False)
+    service = NotifierService()
+    service.sent = []
+
+    async def send(recipient, changes):
+        service.sent.append((recipient, changes))
+    service._send = send
+    return service
+
+def run(notifier, *steps):
+    async def scenario():
+        for recipient, item, mentions in steps:
+            await notifier._enqueue(recipient, item, mentions)
+        await notifier.flush_all()
+    asyncio.run(scenario())
+
+def test_repeated_flips_coalesce(notifier):
+    run(
+        notifier,
+        ("1", change("a", "out_of_stock", "in_stock"), ["1"]),
+        ("1", change("a", "out_of_stock", "out_of_stock"), ["1"]),
+        ("1", change("a", "out_of_stock", "in_stock"), ["1"]),
+    )
+    [(recipient, changes)] = notifier.sent
+    assert recipient == "1"
+    assert len(changes) == 1
+    assert (changes[0]["old"], changes[0]["new"]) == ("out_of_stock", "in_stock")
+
+def test_flip_back_is_not_sent(notifier):
+    run(
+        notifier,
+        ("1", change("a", "out_of_stock", "in_stock"), ["1"]),
+        ("1", change("a", "in_stock", "out_of_stock"), ["1"]),
+    )
+    assert notifier.sent == []
+
+def test_pincodes_and_mentions(notifier):
+    run(
+        notifier,
+        ("channel", change("a", "out_of_stock", "in_stock", "110001"), ["1"]),
+        ("channel", change("a", "out_of_stock", "in_stock", "110001"), ["2"]),
+        ("channel", change("a", "out_of_stock", "in_stock", "400001"), ["3"]),
+    )
+    [(_, changes)] = notifier.sent
+    assert sorted(c["pincode"] for c in changes) == ["110001", "400001"]
+    assert next(c for c in changes if c["pincode"] == "110001")["mentions"] == {"1", "2"}
+
+def test_first_restock_skips_the_window(notifier, monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFY_IMMEDIATE_IN_STOCK", True)
+
+    async def scenario():
+        await notifier._enqueue("1", change("a", "out_of_stock", "in_stock"), ["1"])
+        await notifier._enqueue("1", change("b", "out_of_stock", "in_stock"), ["1"])
+        assert len(notifier.sent) == 1
+        await notifier.flush_all()
+    asyncio.run(scenario())
+    assert [len(changes) for _, changes in notifier.sent] == [1, 1]
+
+def test_pack_respects_count_and_characters():
+    assert _pack(list("abcdef"), [1] * 6, 4, 100) == [list("abcd"), list("ef")]
+    assert _pack(list("abc"), [3000, 3000, 1], 10, 6000) == [list("ab"), list("c")]
+    assert _pack([], [], 10, 6000) == []
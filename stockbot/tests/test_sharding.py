@@ -0,0 +1,23 @@
+from src.services.sharding import HashRing
+
+URLS = [f"https://shop.amul.com/en/product/item-{i}" for i in range(500)]
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([], 8).get_node("anything") is None
+
+def test_same_nodes_give_same_owners():
+    first = HashRing(["a", "b", "c"], 64)
+    second = HashRing(["c", "a", "b"], 64)
+    assert all(first.get_node(url) == second.get_node(url) for url in URLS)
+
+def test_every_node_owns_a_share():
+    ring = HashRing(["a", "b", "c"], 64)
+    owners = [ring.get_node(url) for url in URLS]
+    assert all(owners.count(node) > len(URLS) / 6 for node in ("a", "b", "c"))
+
+def test_join_only_moves_keys_to_the_new_node():
+    before = HashRing(["a", "b", "c"], 64)
+    after = HashRing(["a", "b", "c", "d"], 64)
+    moved = [url for url in URLS if before.get_node(url) != after.get_node(url)]
+    assert moved
+    assert all(after.get_node(url) == "d" for url in moved)
@@ -0,0 +1,46 @@
+import pytest
+
+from src.services.tracing import Tracer, settings
+
+@pytest.fixture
+def tracer(monkeypatch):
+    # Keep only slow or failing traces
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    return Tracer()
+
+def test_healthy_trace_is_dropped(tracer):
+    with tracer.trace("check_product"):
+        with tracer.span("browser"):
+            pass
+    assert tracer.recent(slow_only=False) == []
+
+def test_failed_span_keeps_trace(tracer):
+    with pytest.raises(ValueError):
+        with tracer.trace("check_product", url="u"):
+            with tracer.span("browser", pincode="110001"):
+                raise ValueError("boom")
+    [trace] = tracer.recent()
+    assert trace["error"] == "boom"
+    assert trace["attrs"] == {"url": "u"}
+    assert trace["spans"][0]["attrs"] == {"pincode": "110001"}
+
+def test_nested_trace_becomes_span_and_fail_reaches_root(tracer):
+    with tracer.trace("check_product"):
+        with tracer.trace("check_stock", pincode="400001") as span:
+            span.error = "timeout"
+            tracer.fail("400001: timeout")
+        with tracer.trace("check_stock", pincode="110001"):
+            pass
+    [trace] = tracer.recent()
+    assert trace["error"] == "400001: timeout"
+    assert [span["attrs"]["pincode"] for span in trace["spans"]] == ["400001", "110001"]
+
+def test_slow_trace_is_kept(tracer, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SLOW_SECONDS", 0.0)
+    with tracer.trace("check_product"):
+        pass
+    assert len(tracer.recent(slow_only=True)) == 1
+
+def test_fail_outside_trace_is_ignored(tracer):
+    tracer.fail("no trace")
+    assert tracer.current() is None